@@ -224,6 +224,62 @@ class LWRPClient():
         """Set the GPI pin state for a specific channel."""
         self.setGPO(chnum, pin, state, "GPI")
 
+    def setGPOBulk(self, channels, type = "GPO"):
+        """Set GPO pin masks across many channels in one go.
+
+        channels is a dict of {channel: (mask, states)}, where mask and states are 5-bit integers (bit 0 is pin 1).
+        Pins set in mask are driven high or low from states. All other pins are left alone.
+        Raises ValueError for masks/states outside 0-31, or if a channel appears twice (e.g. as 1 and "1").
+        """
+        commands = self.LWRP.buildGPIOCommands(type, channels)
+
+        if len(commands) > 0:
+            self.LWRP.sendCommand("\n".join(commands))
+
+    def setGPIBulk(self, channels):
+        """Set GPI pin masks across many channels in one go."""
+        self.setGPOBulk(channels, "GPI")
+
+    def GPIBits(self, changing=False):
+        """Get current GPI state for all channels, as a dict of {channel: bitmask} (bit 0 is pin 1, set is high).
+
+        With changing=True, each value is a (state, changing) tuple of bitmasks instead.
+        Channels the device didn't report are left out. If the request times out, the dict is empty.
+        """
+        return self.GPIOBits(self.GPIData(), changing)
+
+    def GPOBits(self, changing=False):
+        """Get current GPO state for all channels, as a dict of {channel: bitmask} (bit 0 is pin 1, set is high).
+
+        With changing=True, each value is a (state, changing) tuple of bitmasks instead.
+        Channels the device didn't report are left out. If the request times out, the dict is empty.
+        """
+        return self.GPIOBits(self.GPOData(), changing)
+
+    def GPIOBits(self, data, changing=False):
+        """Turn GPI/GPO data (as returned by GPIData, GPOData or a subscription) into a dict of {channel: bitmask}."""
+        bits = {}
+
+        if data is None:
+            return bits
+
+        for x in data:
+            if "pin_bits" not in x:
+                continue
+
+            if changing is True:
+                bits[int(x["num"])] = (x["pin_bits"], x["pin_changing"])
+            else:
+                bits[int(x["num"])] = x["pin_bits"]
+
+        return bits
+
+        for x in data:
+            if "pin_bits" in x:
+                bits[int(x["num"])] = x["pin_bits"]
+
+        return bits
+
     def setGPIText(self, chnum, commandText):
         """Set the GPI text command for a specific channel."""
         chnum = str(chnum)
@@ -11,141 +11,12 @@ __license__ = "GPL"
 __version__ = "0.6"
 
 
-class LWRPClientComms(threading.Thread):
-    """This class handles all the communications with the LWRP server."""
-
-    def __init__(self, host, port):
-        """Create a socket connection to the LWRP server."""
-
-        # The handle for the socket connection to the LWRP server
-        self.sock = None
-
-        # A list of all commands to send to the LWRP server
-        self.sendQueue = []
-
-        # A list of data types to subscribe to (with callbacks)
-        self.dataSubscriptions = []
-
-        # Should we be shutting down this thread? Set via self.stop()
-        self._stop = False
-
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-        self.sock.connect((host, port))
-        self.sock.setblocking(0)
+class LWRPParser():
+    """This class turns the text received from a LWRP server into dictionaries. It doesn't talk to the network itself."""
 
-        # Start the thread
-        threading.Thread.__init__(self)
-
-    def stop(self):
-        """Attempt to close this thread."""
-        self._stop = True
-
-    def run(self):
-        """Method keeps running forever, and handles all the communication with the open LWRP socket."""
-        while True:
-
-            # Try and receive data from the LWRP server
-            recvData = self.recvUntilNewline()
-
-            if recvData is not None:
-                self.processReceivedData(recvData)
-
-            # Check if we've got data to send back to the LWRP server
-            if len(self.sendQueue) > 0:
-                dataToSend = self.sendQueue[0]
-
-                while dataToSend:
-                    sent = self.sock.send(dataToSend)
-                    dataToSend = dataToSend[sent:]
-
-                # Once the message has been sent, take it out of the queue
-                self.sendQueue.pop(0)
-
-            if self._stop is True:
-                # End the thread
-                self.sock.close()
-                break
-
-            # Lower this number to receive data quicker
-            if len(self.sendQueue) == 0:
-                time.sleep(0.1)
-
-    def recvUntilNewline(self):
-        """Receive data until we get to the end of a message (also accounts for BEGIN/END blocks)."""
-        totalData = ""
-        inBlock = False
-
-        while True:
-            try:
-                totalData += self.sock.recv(1024)
-            except:
-                pass
-
-            # Check if we're in a data block
-            if totalData[:5] == "BEGIN":
-                inBlock = True
-
-            # Check if the datablock is over
-            if "END" in totalData[-5:]:
-                return totalData
-
-            # If we're not in a datablock and a newline is found, return the data
-            if "\n" in totalData and inBlock is False:
-                return totalData
-
-            # We return 'None' if there's no data to return
-            if totalData == "":
-                return None
-
-    def processReceivedData(self, recvData):
-        """Process the received data from the LWRP server. Attempts to parse it and trigger all the subscribed callbacks."""
-        # A dict with all the different message types we've received
-        messageTypes = {}
-
-        # Parse the data so it's in a usable format
-        # We receive a list in return (one per message - for blocks of data)
-        parsedData = self.parseMessage(recvData)
-
-        # Enumerate over all the messages
-        for dataIndex, data in enumerate(parsedData):
-
-            # Check if messageTypes already contains a list for this type.
-            # If not, create one
-            if parsedData[dataIndex]['type'] not in messageTypes:
-                messageTypes[parsedData[dataIndex]['type']] = []
-
-            # Add this message to the appropriate messageTypes list
-            messageTypes[parsedData[dataIndex]['type']].append(parsedData[dataIndex])
-
-        # Loop over every subscription
-        for subI, subX in enumerate(self.dataSubscriptions):
-
-            # If the subscribed command type matches the message's command type
-            if subX['commandType'] in messageTypes:
-
-                # Execute the callback!
-                subX['callback'](messageTypes[subX['commandType']])
-
-            # Check if we need to decrement the limit
-            if self.dataSubscriptions[subI]['limit'] is not False:
-                self.dataSubscriptions[subI]['limit'] = self.dataSubscriptions[subI]['limit'] - 1
-
-            # Check if we need to remove this subscription
-            if self.dataSubscriptions[subI]['limit'] <= 0 and self.dataSubscriptions[subI]['limit'] is not False:
-                self.dataSubscriptions.pop(subI)
-
-    def sendCommand(self, msg):
-        """Buffer a command to send."""
-        self.sendQueue.append(msg + "\n")
-
-    def addSubscription(self, subType, callbackObj, limit=False, filters={}):
-        """Add a subscription to the list of data subscriptions."""
-        self.dataSubscriptions.append({
-            "commandType": subType,
-            "callback": callbackObj,
-            "limit": limit
-        })
+    # Should GPI/GPO messages include the 'pin_states' list of dicts?
+    # Set this to False if you only need the 'pin_bits' & 'pin_changing' bitmasks (saves a lot of allocation)
+    parsePinStates = True
 
     def splitSegments(self, string):
         """Attempt to parse all the segments provided in return data."""
@@ -249,7 +120,9 @@ class LWRPClientComms(threading.Thread):
                     # We have a text command
                     data["attributes"] = self.parseAttributes(segments[1:])
                 else:
-                    data["pin_states"] = self.parseGPIOStates(segments[1])
+                    if self.parsePinStates is True:
+                        data["pin_states"] = self.parseGPIOStates(segments[1])
+                    data["pin_bits"], data["pin_changing"] = self.parseGPIOBits(segments[1])
 
             elif x[:3] == "GPO":
                 segments = self.splitSegments(x[4:])
@@ -261,7 +134,9 @@ class LWRPClientComms(threading.Thread):
                     # We have a text command
                     data["attributes"] = self.parseAttributes(segments[1:])
                 else:
-                    data["pin_states"] = self.parseGPIOStates(segments[1])
+                    if self.parsePinStates is True:
+                        data["pin_states"] = self.parseGPIOStates(segments[1])
+                    data["pin_bits"], data["pin_changing"] = self.parseGPIOBits(segments[1])
 
             elif x[:3] == "MIX":
                 segments = self.splitSegments(x[4:])
@@ -428,3 +303,203 @@ class LWRPClientComms(threading.Thread):
             attrs.append(data)
 
         return attrs
+
+    def parseGPIOBits(self, states):
+        """Turn the 'hlHLh' GPIO state strings into (high, changing) bitmasks. Bit 0 is pin 1."""
+        stateBits = 0
+        changingBits = 0
+
+        for i, x in enumerate(states):
+            if x == "h" or x == "H":
+                stateBits |= 1 << i
+
+            if x == "H" or x == "L":
+                changingBits |= 1 << i
+
+        return stateBits, changingBits
+
+    @staticmethod
+    def buildGPIOCommands(cmdType, channels):
+        """Build the minimal list of GPI/GPO commands for a dict of {channel: (mask, states)} bitmasks."""
+        merged = {}
+
+        # Normalise channel numbers (e.g. 1 and "1" are the same channel)
+        for chnum, (mask, states) in channels.items():
+            chnum = int(chnum)
+            mask = int(mask)
+            states = int(states)
+
+            if mask < 0 or mask > 31:
+                raise ValueError("Incorrect pin mask specified. Use a value between 0 and 31.")
+
+            if states < 0 or states > 31:
+                raise ValueError("Incorrect pin states specified. Use a value between 0 and 31.")
+
+            if chnum in merged:
+                raise ValueError("Channel " + str(chnum) + " specified more than once.")
+
+            merged[chnum] = (mask, states)
+
+        commands = []
+
+        for chnum in sorted(merged):
+            mask, states = merged[chnum]
+
+            # Nothing to change on this channel
+            if mask == 0:
+                continue
+
+            # Build the pin state string (e.g. mask 0b00101, states 0b00001 will give hxlxx)
+            pinstr = ""
+            for i in range(5):
+                if not mask & (1 << i):
+                    pinstr += "x"
+                elif states & (1 << i):
+                    pinstr += "h"
+                else:
+                    pinstr += "l"
+
+            commands.append(cmdType + " " + str(chnum) + " " + pinstr)
+
+        return commands
+
+
+class LWRPClientComms(threading.Thread, LWRPParser):
+    """This class handles all the communications with the LWRP server."""
+
+    def __init__(self, host, port, timeout=None):
+        """Create a socket connection to the LWRP server. timeout (in seconds) limits how long we wait to connect."""
+
+        # The handle for the socket connection to the LWRP server
+        self.sock = None
+
+        # A list of all commands to send to the LWRP server
+        self.sendQueue = []
+
+        # A list of data types to subscribe to (with callbacks)
+        self.dataSubscriptions = []
+
+        # Should we be shutting down this thread? Set via self.stop()
+        # (Not called '_stop', as that would hide threading.Thread's own _stop method and break join())
+        self.stopping = False
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        if timeout is not None:
+            self.sock.settimeout(timeout)
+
+        self.sock.connect((host, port))
+        self.sock.setblocking(0)
+
+        # Start the thread
+        threading.Thread.__init__(self)
+
+    def stop(self):
+        """Attempt to close this thread. Any commands already queued are sent first."""
+        self.stopping = True
+
+    def run(self):
+        """Method keeps running forever, and handles all the communication with the open LWRP socket."""
+        while True:
+
+            # Try and receive data from the LWRP server
+            recvData = self.recvUntilNewline()
+
+            if recvData is not None:
+                self.processReceivedData(recvData)
+
+            # Check if we've got data to send back to the LWRP server
+            if len(self.sendQueue) > 0:
+                dataToSend = self.sendQueue[0]
+
+                while dataToSend:
+                    sent = self.sock.send(dataToSend)
+                    dataToSend = dataToSend[sent:]
+
+                # Once the message has been sent, take it out of the queue
+                self.sendQueue.pop(0)
+
+            if self.stopping is True and len(self.sendQueue) == 0:
+                # End the thread once everything has been sent
+                self.sock.close()
+                break
+
+            # Lower this number to receive data quicker
+            if len(self.sendQueue) == 0:
+                time.sleep(0.1)
+
+    def recvUntilNewline(self):
+        """Receive data until we get to the end of a message (also accounts for BEGIN/END blocks)."""
+        totalData = ""
+        inBlock = False
+
+        while True:
+            try:
+                totalData += self.sock.recv(1024)
+            except:
+                pass
+
+            # Check if we're in a data block
+            if totalData[:5] == "BEGIN":
+                inBlock = True
+
+            # Check if the datablock is over
+            if "END" in totalData[-5:]:
+                return totalData
+
+            # If we're not in a datablock and a newline is found, return the data
+            if "\n" in totalData and inBlock is False:
+                return totalData
+
+            # We return 'None' if there's no data to return
+            if totalData == "":
+                return None
+
+    def processReceivedData(self, recvData):
+        """Process the received data from the LWRP server. Attempts to parse it and trigger all the subscribed callbacks."""
+        # A dict with all the different message types we've received
+        messageTypes = {}
+
+        # Parse the data so it's in a usable format
+        # We receive a list in return (one per message - for blocks of data)
+        parsedData = self.parseMessage(recvData)
+
+        # Enumerate over all the messages
+        for dataIndex, data in enumerate(parsedData):
+
+            # Check if messageTypes already contains a list for this type.
+            # If not, create one
+            if parsedData[dataIndex]['type'] not in messageTypes:
+                messageTypes[parsedData[dataIndex]['type']] = []
+
+            # Add this message to the appropriate messageTypes list
+            messageTypes[parsedData[dataIndex]['type']].append(parsedData[dataIndex])
+
+        # Loop over every subscription
+        for subI, subX in enumerate(self.dataSubscriptions):
+
+            # If the subscribed command type matches the message's command type
+            if subX['commandType'] in messageTypes:
+
+                # Execute the callback!
+                subX['callback'](messageTypes[subX['commandType']])
+
+            # Check if we need to decrement the limit
+            if self.dataSubscriptions[subI]['limit'] is not False:
+                self.dataSubscriptions[subI]['limit'] = self.dataSubscriptions[subI]['limit'] - 1
+
+            # Check if we need to remove this subscription
+            if self.dataSubscriptions[subI]['limit'] <= 0 and self.dataSubscriptions[subI]['limit'] is not False:
+                self.dataSubscriptions.pop(subI)
+
+    def sendCommand(self, msg):
+        """Buffer a command to send."""
+        self.sendQueue.append(msg + "\n")
+
+    def addSubscription(self, subType, callbackObj, limit=False, filters={}):
+        """Add a subscription to the list of data subscriptions."""
+        self.dataSubscriptions.append({
+            "commandType": subType,
+            "callback": callbackObj,
+            "limit": limit
+        })
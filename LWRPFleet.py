@@ -0,0 +1,709 @@
+"""LWRP Client (Fleet Class). Spreads connections to a large number of Livewire nodes across a pool of worker processes."""
+
+import errno
+import multiprocessing
+import os
+import select
+import socket
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from LWRPClientComms import LWRPClientComms, LWRPParser
+
+__author__ = "Anthony Eden"
+__copyright__ = "Copyright 2015-2018, Anthony Eden / Media Realm"
+__credits__ = ["Anthony Eden"]
+__license__ = "GPL"
+__version__ = "0.6"
+
+# Meter values stored in shared memory before any data has been received for a channel
+METER_NO_DATA = -32768
+
+# GPIO bitmasks stored in shared memory before any data has been received for a channel
+GPIO_NO_DATA = -1
+
+# The order of the meter values for each channel in the shared meter array.
+# Each channel's record starts with a sequence counter, which is odd while the record is being written.
+METER_FIELDS = ["PEAK_L", "PEAK_R", "RMS_L", "RMS_R"]
+METER_RECORD = len(METER_FIELDS) + 1
+
+# Connection states stored in shared memory for each node
+NODE_DISCONNECTED = 0
+NODE_CONNECTING = 1
+NODE_CONNECTED = 2
+NODE_STATES = {NODE_DISCONNECTED: "disconnected", NODE_CONNECTING: "connecting", NODE_CONNECTED: "connected"}
+
+# Message types which are forwarded from the workers to the parent process as events.
+# Meter and GPIO data is written straight into shared memory instead.
+EVENT_TYPES = ["DEVICE", "NETWORK", "SET", "SOURCE", "DESTINATION", "LEVEL_ALERT", "MATRIX", "ERROR"]
+
+
+class LWRPFleetWorker(multiprocessing.Process, LWRPParser):
+    """This process handles the connections and parsing for one shard of the fleet's nodes, all from a single select() loop.
+
+    select() can't handle more than about 1000 sockets on most platforms, so keep each shard below that.
+    """
+
+    # We only store GPIO state as bitmasks, so don't bother building the pin_states dicts
+    parsePinStates = False
+
+    def __init__(self, workerIndex, nodes, channels, connectTimeout, reconnectDelay, meterState, gpioState, nodeState, parseCount, commandQueue, eventQueue):
+        """Setup the worker. Connections are made once the process has started."""
+
+        # Our position in the parent's list of workers (used for our slot in parseCount)
+        self.workerIndex = workerIndex
+
+        # A list of (nodeIndex, host, port) tuples this worker is responsible for
+        self.nodes = nodes
+
+        # The number of channels reserved for each node in the shared arrays
+        self.channels = channels
+
+        # How long to wait (in seconds) for a node to accept our connection, and how long to wait before trying again
+        self.connectTimeout = connectTimeout
+        self.reconnectDelay = reconnectDelay
+
+        # Shared memory arrays, owned by the parent process
+        self.meterState = meterState
+        self.gpioState = gpioState
+        self.nodeState = nodeState
+        self.parseCount = parseCount
+
+        # Commands come in from the parent process on commandQueue, events go back out on eventQueue
+        self.commandQueue = commandQueue
+        self.eventQueue = eventQueue
+
+        # A dict of {nodeIndex: connection details} for every node in this shard. Only populated inside the worker.
+        self.connections = {}
+
+        # A dict of {socket: nodeIndex} for every open socket. Only populated inside the worker.
+        self.sockets = {}
+
+        # Commands (e.g. LOGIN, ADD GPI) which are sent to every node again each time it connects
+        self.sessionCommands = []
+
+        multiprocessing.Process.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        """Keep every node in this shard connected, and pass data between the nodes and the parent process until told to stop."""
+        for nodeIndex, host, port in self.nodes:
+            self.connections[nodeIndex] = {
+                "host": host,
+                "port": port,
+                "sock": None,
+                "state": NODE_DISCONNECTED,
+                "deadline": 0,
+                "retryAt": 0,
+                "recvBuffer": "",
+                "block": None,
+                "sendBuffer": b"",
+                "pending": [],
+                "lastError": None,
+            }
+
+        stopping = False
+        stopDeadline = None
+
+        while True:
+            if stopping is False and self.processCommands() is True:
+                # Give the nodes a little while to take any commands still waiting to be sent
+                stopping = True
+                stopDeadline = time.time() + self.connectTimeout
+
+            now = time.time()
+
+            for nodeIndex, conn in self.connections.items():
+                if conn["state"] == NODE_DISCONNECTED and stopping is False and conn["retryAt"] <= now:
+                    self.connect(nodeIndex)
+
+                elif conn["state"] == NODE_CONNECTING and conn["deadline"] <= now:
+                    self.disconnect(nodeIndex, "Timed out connecting to " + conn["host"] + ":" + str(conn["port"]))
+
+            if stopping is True and (now >= stopDeadline or self.flushed() is True):
+                break
+
+            readers = []
+            writers = []
+
+            for sock, nodeIndex in self.sockets.items():
+                conn = self.connections[nodeIndex]
+
+                if conn["state"] == NODE_CONNECTED:
+                    readers.append(sock)
+
+                if conn["state"] == NODE_CONNECTING or len(conn["sendBuffer"]) > 0:
+                    writers.append(sock)
+
+            if len(readers) == 0 and len(writers) == 0:
+                time.sleep(0.05)
+                continue
+
+            # Failed connections show up in the exceptional list on Windows
+            readable, writable, failed = select.select(readers, writers, writers, 0.05)
+
+            for sock in failed:
+                if sock in self.sockets and self.connections[self.sockets[sock]]["state"] == NODE_CONNECTING:
+                    self.finishConnect(self.sockets[sock])
+
+            for sock in writable:
+                if sock in self.sockets:
+                    if self.connections[self.sockets[sock]]["state"] == NODE_CONNECTING:
+                        self.finishConnect(self.sockets[sock])
+                    else:
+                        self.sendBuffered(self.sockets[sock])
+
+            for sock in readable:
+                if sock in self.sockets:
+                    self.receive(self.sockets[sock])
+
+        for nodeIndex, conn in self.connections.items():
+            if len(conn["pending"]) > 0:
+                message = "Stopped before connecting to " + conn["host"] + ":" + str(conn["port"])
+                self.eventQueue.put((nodeIndex, "ERROR", [{"type": "ERROR", "message": message + " (" + str(len(conn["pending"])) + " command(s) not sent)"}]))
+
+            self.close(nodeIndex)
+
+    def processCommands(self):
+        """Pass on every command waiting in the command queue. Returns True once we've been told to stop."""
+        while True:
+            try:
+                nodeIndex, commandType, payload = self.commandQueue.get_nowait()
+            except queue.Empty:
+                return False
+
+            # Sent by LWRPFleet.stop(), after every other command
+            if commandType == "STOP":
+                return True
+
+            try:
+                if commandType == "SESSION":
+                    if payload not in self.sessionCommands:
+                        self.sessionCommands.append(payload)
+
+                # A nodeIndex of None means the command goes to every node in this shard
+                if nodeIndex is None:
+                    targets = list(self.connections)
+                else:
+                    targets = [nodeIndex]
+
+                for target in targets:
+                    # Nodes which aren't connected yet get session commands when they connect
+                    if commandType == "SESSION" and self.connections[target]["state"] != NODE_CONNECTED:
+                        continue
+
+                    self.sendToNode(target, payload)
+
+            except Exception as e:
+                self.eventQueue.put((nodeIndex, "ERROR", [{"type": "ERROR", "message": "Could not send command: " + repr(e)}]))
+
+    def sendToNode(self, nodeIndex, msg):
+        """Buffer a command for a node. Commands for a node that isn't connected yet are held until it connects."""
+        conn = self.connections[nodeIndex]
+        msg = msg + "\n"
+
+        if conn["state"] == NODE_CONNECTED:
+            conn["sendBuffer"] += self.encode(msg)
+        else:
+            conn["pending"].append(msg)
+
+    def encode(self, msg):
+        """Turn a command into bytes, ready to send."""
+        if isinstance(msg, bytes):
+            return msg
+
+        return msg.encode("latin-1")
+
+    def flushed(self):
+        """Check if every connected node has been sent all its commands, and no node is still connecting with commands waiting."""
+        for conn in self.connections.values():
+            if conn["state"] == NODE_CONNECTED and len(conn["sendBuffer"]) > 0:
+                return False
+
+            if conn["state"] == NODE_CONNECTING and len(conn["pending"]) > 0:
+                return False
+
+        return True
+
+    def connect(self, nodeIndex):
+        """Start a non-blocking connection to a node."""
+        conn = self.connections[nodeIndex]
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+
+        try:
+            result = sock.connect_ex((conn["host"], conn["port"]))
+        except socket.error as e:
+            # e.g. the hostname can't be resolved
+            sock.close()
+            self.connectionFailed(nodeIndex, "Could not connect to " + conn["host"] + ":" + str(conn["port"]) + ": " + str(e))
+            return
+
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK)):
+            sock.close()
+            self.connectionFailed(nodeIndex, "Could not connect to " + conn["host"] + ":" + str(conn["port"]) + ": " + os.strerror(result))
+            return
+
+        conn["sock"] = sock
+        conn["state"] = NODE_CONNECTING
+        conn["deadline"] = time.time() + self.connectTimeout
+        self.sockets[sock] = nodeIndex
+        self.nodeState[nodeIndex] = NODE_CONNECTING
+
+    def finishConnect(self, nodeIndex):
+        """Check the result of a non-blocking connection, and send the session & pending commands once it's up."""
+        conn = self.connections[nodeIndex]
+        result = conn["sock"].getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+
+        if result != 0:
+            self.disconnect(nodeIndex, "Could not connect to " + conn["host"] + ":" + str(conn["port"]) + ": " + os.strerror(result))
+            return
+
+        conn["state"] = NODE_CONNECTED
+        conn["lastError"] = None
+        self.nodeState[nodeIndex] = NODE_CONNECTED
+
+        commands = [x + "\n" for x in self.sessionCommands] + conn["pending"]
+        conn["sendBuffer"] = self.encode("".join(commands))
+        conn["pending"] = []
+
+    def sendBuffered(self, nodeIndex):
+        """Send as much of a node's buffered commands as the socket will take."""
+        conn = self.connections[nodeIndex]
+
+        try:
+            sent = conn["sock"].send(conn["sendBuffer"])
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+
+            self.disconnect(nodeIndex, "Connection to " + conn["host"] + ":" + str(conn["port"]) + " lost: " + str(e))
+            return
+
+        conn["sendBuffer"] = conn["sendBuffer"][sent:]
+
+    def receive(self, nodeIndex):
+        """Receive data from a node, and parse every complete message (also accounts for BEGIN/END blocks)."""
+        conn = self.connections[nodeIndex]
+
+        try:
+            data = conn["sock"].recv(65536)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+
+            self.disconnect(nodeIndex, "Connection to " + conn["host"] + ":" + str(conn["port"]) + " lost: " + str(e))
+            return
+
+        if not data:
+            self.disconnect(nodeIndex, "Connection to " + conn["host"] + ":" + str(conn["port"]) + " closed")
+            return
+
+        if not isinstance(data, str):
+            data = data.decode("latin-1")
+
+        conn["recvBuffer"] += data
+
+        # Only take complete lines. The rest waits for the next recv()
+        end = conn["recvBuffer"].rfind("\n")
+        if end == -1:
+            return
+
+        lines = conn["recvBuffer"][:end].splitlines()
+        conn["recvBuffer"] = conn["recvBuffer"][end + 1:]
+
+        messages = []
+
+        for line in lines:
+            if conn["block"] is not None:
+                conn["block"].append(line)
+
+                # Only hand over a data block once it's complete
+                if line[:3] == "END":
+                    messages.extend(conn["block"])
+                    conn["block"] = None
+
+            elif line[:5] == "BEGIN":
+                conn["block"] = [line]
+
+            else:
+                messages.append(line)
+
+        if len(messages) > 0:
+            self.processReceivedData(nodeIndex, "\n".join(messages))
+
+    def processReceivedData(self, nodeIndex, recvData):
+        """Parse the received data, store meter & GPIO state in shared memory and pass everything else to the parent process."""
+        # A dict with all the different message types we've received
+        messageTypes = {}
+
+        parsedData = self.parseMessage(recvData)
+        self.parseCount[self.workerIndex] += len(parsedData)
+
+        for data in parsedData:
+            if data['type'] not in messageTypes:
+                messageTypes[data['type']] = []
+
+            messageTypes[data['type']].append(data)
+
+        for messageType, data in messageTypes.items():
+            if messageType == "METER":
+                self.storeMeters(nodeIndex, data)
+
+            elif messageType == "GPI":
+                self.storeGPIO(nodeIndex, 0, data)
+
+            elif messageType == "GPO":
+                self.storeGPIO(nodeIndex, 1, data)
+
+            elif messageType in EVENT_TYPES:
+                self.eventQueue.put((nodeIndex, messageType, data))
+
+    def connectionFailed(self, nodeIndex, message):
+        """Report a failed or lost connection, and schedule the next attempt."""
+        conn = self.connections[nodeIndex]
+
+        conn["state"] = NODE_DISCONNECTED
+        conn["retryAt"] = time.time() + self.reconnectDelay
+        self.nodeState[nodeIndex] = NODE_DISCONNECTED
+
+        # Don't repeat the same error every time we retry a node that's down
+        report = message != conn["lastError"]
+        conn["lastError"] = message
+
+        # Commands only wait for one connection attempt. After that they're too stale to send.
+        if len(conn["pending"]) > 0:
+            message += " (" + str(len(conn["pending"])) + " command(s) not sent)"
+            conn["pending"] = []
+            report = True
+
+        if report is True:
+            self.eventQueue.put((nodeIndex, "ERROR", [{"type": "ERROR", "message": message}]))
+
+    def disconnect(self, nodeIndex, message):
+        """Close a node's connection after an error, and schedule a reconnect."""
+        self.close(nodeIndex)
+        self.connectionFailed(nodeIndex, message)
+
+    def close(self, nodeIndex):
+        """Close a node's socket and clear its buffers."""
+        conn = self.connections[nodeIndex]
+
+        if conn["sock"] is not None:
+            del self.sockets[conn["sock"]]
+            conn["sock"].close()
+
+        conn["sock"] = None
+        conn["state"] = NODE_DISCONNECTED
+        conn["recvBuffer"] = ""
+        conn["block"] = None
+        conn["sendBuffer"] = b""
+        self.nodeState[nodeIndex] = NODE_DISCONNECTED
+
+    def storeMeters(self, nodeIndex, data):
+        """Write meter data into the shared meter array.
+
+        Fields missing from a message keep their previous value. The record's sequence counter is odd while we're writing,
+        so the parent process can tell when it's read a half-written record.
+        """
+        for x in data:
+            if x["io"] == "in":
+                io = 0
+            elif x["io"] == "out":
+                io = 1
+            else:
+                continue
+
+            try:
+                chnum = int(x["num"])
+            except ValueError:
+                continue
+
+            if chnum < 1 or chnum > self.channels:
+                continue
+
+            values = []
+            for field in METER_FIELDS:
+                try:
+                    values.append(int(x["attributes"][field]))
+                except (KeyError, ValueError):
+                    values.append(None)
+
+            offset = ((nodeIndex * 2 + io) * self.channels + chnum - 1) * METER_RECORD
+
+            # Keep the counter small enough for a C int. Masking keeps the odd/even bit intact.
+            self.meterState[offset] = (self.meterState[offset] + 1) & 0x3FFFFFFF
+
+            for i, value in enumerate(values):
+                if value is not None:
+                    self.meterState[offset + 1 + i] = value
+
+            self.meterState[offset] = (self.meterState[offset] + 1) & 0x3FFFFFFF
+
+    def storeGPIO(self, nodeIndex, gpioType, data):
+        """Write GPI (gpioType 0) or GPO (gpioType 1) pin bitmasks into the shared GPIO array."""
+        for x in data:
+            if "pin_bits" not in x:
+                # Text commands don't carry any pin state
+                continue
+
+            try:
+                chnum = int(x["num"])
+            except ValueError:
+                continue
+
+            if chnum < 1 or chnum > self.channels:
+                continue
+
+            self.gpioState[(nodeIndex * 2 + gpioType) * self.channels + chnum - 1] = x["pin_bits"]
+
+
+class LWRPFleet():
+    """Provides a friendly API for talking to a large fleet of Livewire nodes, sharded across worker processes."""
+
+    def __init__(self, nodes, workers=None, channels=8, connectTimeout=5, reconnectDelay=10):
+        """Setup the fleet. nodes is a list of (host, port) tuples, referred to by their index from here on.
+
+        Add your subscriptions, then call start() to connect.
+        """
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        workers = max(1, min(int(workers), len(nodes)))
+
+        self.nodes = list(nodes)
+        self.channels = int(channels)
+
+        # Meter state for every node: [node][in/out][channel][sequence, PEAK_L, PEAK_R, RMS_L, RMS_R]
+        self.meterState = multiprocessing.Array("i", len(self.nodes) * 2 * self.channels * METER_RECORD, lock=False)
+        for i in range(len(self.meterState)):
+            if i % METER_RECORD != 0:
+                self.meterState[i] = METER_NO_DATA
+
+        # GPIO state for every node: [node][GPI/GPO][channel], stored as a bitmask (bit 0 is pin 1, set is high)
+        # Channels we haven't received any GPIO data for yet are set to GPIO_NO_DATA
+        self.gpioState = multiprocessing.Array("i", len(self.nodes) * 2 * self.channels, lock=False)
+        for i in range(len(self.gpioState)):
+            self.gpioState[i] = GPIO_NO_DATA
+
+        # Connection state for every node (NODE_DISCONNECTED, NODE_CONNECTING or NODE_CONNECTED)
+        self.nodeState = multiprocessing.Array("i", len(self.nodes), lock=False)
+
+        # The number of messages each worker has parsed
+        self.parseCount = multiprocessing.Array("d", workers, lock=False)
+
+        # A list of data types to subscribe to (with callbacks)
+        self.dataSubscriptions = []
+
+        self.eventQueue = multiprocessing.Queue()
+        self.workers = []
+
+        # Spread the nodes across the workers round-robin
+        for w in range(workers):
+            shard = []
+            for nodeIndex in range(w, len(self.nodes), workers):
+                host, port = self.nodes[nodeIndex]
+                shard.append((nodeIndex, host, port))
+
+            self.workers.append(LWRPFleetWorker(w, shard, self.channels, connectTimeout, reconnectDelay, self.meterState, self.gpioState, self.nodeState, self.parseCount, multiprocessing.Queue(), self.eventQueue))
+
+        # This thread runs the subscription callbacks for events coming back from the workers
+        self.eventThread = threading.Thread(target=self.processEvents)
+        self.eventThread.daemon = True
+
+    def start(self):
+        """Start the worker processes and connect to every node."""
+        self.eventThread.start()
+
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """Send any queued commands, then close all the connections and shut down the worker processes."""
+        for worker in self.workers:
+            worker.commandQueue.put((None, "STOP", None))
+
+        for worker in self.workers:
+            worker.join()
+            worker.commandQueue.close()
+            worker.commandQueue.join_thread()
+
+        # The workers have all exited, so this is the last thing the event thread will receive
+        self.eventQueue.put((None, "STOP", None))
+        self.eventThread.join()
+
+        self.eventQueue.close()
+        self.eventQueue.join_thread()
+
+    def processEvents(self):
+        """Receive events from the workers and trigger all the subscribed callbacks."""
+        while True:
+            nodeIndex, commandType, data = self.eventQueue.get()
+
+            # Sent by stop(), once all the workers have exited
+            if commandType == "STOP":
+                break
+
+            for subX in self.dataSubscriptions:
+                if subX['commandType'] == commandType:
+                    subX['callback'](nodeIndex, data)
+
+    def addSubscription(self, subType, callback):
+        """Add a subscription to the list of data subscriptions. Callbacks receive the node index and the data."""
+        self.dataSubscriptions.append({
+            "commandType": subType,
+            "callback": callback
+        })
+
+    def checkNodeIndex(self, nodeIndex):
+        """Make sure a node index refers to a node in the fleet."""
+        if nodeIndex < 0 or nodeIndex >= len(self.nodes):
+            raise ValueError("Node index out of range. Use a value between 0 and " + str(len(self.nodes) - 1) + ".")
+
+    def checkChannel(self, chnum):
+        """Make sure a channel number fits in the shared state arrays."""
+        if chnum < 1 or chnum > self.channels:
+            raise ValueError("Channel number out of range. Use a value between 1 and " + str(self.channels) + ".")
+
+    def sendCommand(self, nodeIndex, msg):
+        """Send a command to a single node."""
+        self.checkNodeIndex(nodeIndex)
+        self.workers[nodeIndex % len(self.workers)].commandQueue.put((nodeIndex, "CMD", str(msg)))
+
+    def broadcastCommand(self, msg):
+        """Send a command to every node."""
+        for worker in self.workers:
+            worker.commandQueue.put((None, "CMD", str(msg)))
+
+    def broadcastSessionCommand(self, msg):
+        """Send a command to every node now, and again whenever a node reconnects."""
+        for worker in self.workers:
+            worker.commandQueue.put((None, "SESSION", str(msg)))
+
+    def login(self, password=None):
+        """Login to every node (and again whenever a node reconnects). Required for non-info commands."""
+        if password is not None:
+            self.broadcastSessionCommand("LOGIN " + password)
+        else:
+            self.broadcastSessionCommand("LOGIN")
+
+    def errorSub(self, callback):
+        """Subscribe to error messages from every node. This includes failed and lost connections."""
+        self.addSubscription("ERROR", callback)
+
+    def sourceDataSub(self, callback):
+        """Subscribe to audio source data updates from every node."""
+        self.addSubscription("SOURCE", callback)
+        self.broadcastSessionCommand("SRC")
+
+    def destinationDataSub(self, callback):
+        """Subscribe to audio destination data updates from every node."""
+        self.addSubscription("DESTINATION", callback)
+        self.broadcastSessionCommand("DST")
+
+    def levelAlertSub(self, callback):
+        """Subscribe to Level Alerts (Silence & Clipping detection) from every node."""
+        self.addSubscription("LEVEL_ALERT", callback)
+
+    def matrixSub(self, callback):
+        """Subscribe to matrix changes from every node."""
+        self.addSubscription("MATRIX", callback)
+        self.broadcastSessionCommand("MIX")
+
+    def GPIOSub(self):
+        """Start receiving GPI & GPO updates from every node into the shared GPIO state."""
+        self.broadcastSessionCommand("ADD GPI")
+        self.broadcastSessionCommand("ADD GPO")
+
+    def requestMeters(self):
+        """Ask every node for its current audio level meter data. Results are written to the shared meter state."""
+        self.broadcastCommand("MTR")
+
+    def setGPOBulk(self, nodeIndex, channels, type = "GPO"):
+        """Set GPO pin masks across many channels on a node. channels is a dict of {channel: (mask, states)}."""
+        self.checkNodeIndex(nodeIndex)
+
+        # Build the commands here, so bad input raises in the caller rather than in the worker
+        commands = LWRPClientComms.buildGPIOCommands(type, channels)
+
+        if len(commands) > 0:
+            self.sendCommand(nodeIndex, "\n".join(commands))
+
+    def setGPIBulk(self, nodeIndex, channels):
+        """Set GPI pin masks across many channels on a node."""
+        self.setGPOBulk(nodeIndex, channels, "GPI")
+
+    def connectionState(self, nodeIndex):
+        """Get the connection state of a node: 'disconnected', 'connecting' or 'connected'."""
+        self.checkNodeIndex(nodeIndex)
+        return NODE_STATES[self.nodeState[nodeIndex]]
+
+    def parsedMessages(self):
+        """Get the total number of messages parsed by all the workers so far."""
+        return int(sum(self.parseCount[:]))
+
+    def meterLevels(self, nodeIndex, io, chnum):
+        """Get the latest meter levels for a channel on a node, as a dict of PEAK_L, PEAK_R, RMS_L & RMS_R.
+
+        Returns None if no meter data has been received yet. Fields which haven't been received yet are None.
+        All the fields come from the same update - if a worker is part way through writing them, we read them again.
+        """
+        self.checkNodeIndex(nodeIndex)
+
+        chnum = int(chnum)
+        self.checkChannel(chnum)
+
+        if io == "in":
+            ioIndex = 0
+        elif io == "out":
+            ioIndex = 1
+        else:
+            raise ValueError("IO Direction set incorrectly. Use 'in' or 'out'.")
+
+        offset = ((nodeIndex * 2 + ioIndex) * self.channels + chnum - 1) * METER_RECORD
+
+        while True:
+            record = self.meterState[offset:offset + METER_RECORD]
+
+            # An even sequence number that didn't change while we were reading means the record is complete
+            if record[0] % 2 == 0 and self.meterState[offset] == record[0]:
+                break
+
+        values = record[1:]
+
+        if values.count(METER_NO_DATA) == len(values):
+            return None
+
+        levels = {}
+        for field, value in zip(METER_FIELDS, values):
+            if value == METER_NO_DATA:
+                levels[field] = None
+            else:
+                levels[field] = value
+
+        return levels
+
+    def GPIBits(self, nodeIndex):
+        """Get the GPI state of every channel on a node, as a list of bitmasks (bit 0 is pin 1, set is high).
+
+        Channels without any GPI data yet are GPIO_NO_DATA (-1), so check for that before testing bits.
+        """
+        self.checkNodeIndex(nodeIndex)
+        offset = nodeIndex * 2 * self.channels
+        return self.gpioState[offset:offset + self.channels]
+
+    def GPOBits(self, nodeIndex):
+        """Get the GPO state of every channel on a node, as a list of bitmasks (bit 0 is pin 1, set is high).
+
+        Channels without any GPO data yet are GPIO_NO_DATA (-1), so check for that before testing bits.
+        """
+        self.checkNodeIndex(nodeIndex)
+        offset = (nodeIndex * 2 + 1) * self.channels
+        return self.gpioState[offset:offset + self.channels]
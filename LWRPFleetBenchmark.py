@@ -0,0 +1,103 @@
+"""LWRP Client (Fleet Benchmark). Measures how many messages per second LWRPFleet parses as the number of workers grows."""
+
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+
+from LWRPFleet import LWRPFleet
+
+__author__ = "Anthony Eden"
+__copyright__ = "Copyright 2015-2018, Anthony Eden / Media Realm"
+__credits__ = ["Anthony Eden"]
+__license__ = "GPL"
+__version__ = "0.6"
+
+
+def fakeNodes(count, ready):
+    """Pretend to be a set of Livewire nodes, each sending meter & GPIO updates as fast as it can."""
+    chunk = b""
+    for ch in range(1, 9):
+        chunk += ("MTR ICH " + str(ch) + " PEEK:-100:-120 RMS:-200:-220\n").encode("latin-1")
+        chunk += ("MTR OCH " + str(ch) + " PEEK:-150:-160 RMS:-250:-260\n").encode("latin-1")
+        chunk += ("GPO " + str(ch) + " hlhlh\n").encode("latin-1")
+    chunk = chunk * 50
+
+    def serve(conn):
+        try:
+            while True:
+                conn.sendall(chunk)
+        except socket.error:
+            pass
+
+    def listen(srv):
+        while True:
+            conn, addr = srv.accept()
+            t = threading.Thread(target=serve, args=(conn,))
+            t.daemon = True
+            t.start()
+
+    ports = []
+    for i in range(count):
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.bind(("127.0.0.1", 0))
+        srv.listen(5)
+        ports.append(srv.getsockname()[1])
+
+        t = threading.Thread(target=listen, args=(srv,))
+        t.daemon = True
+        t.start()
+
+    ready.put(ports)
+
+    while True:
+        time.sleep(1)
+
+
+def main(nodeCount=64, duration=5, serverProcesses=2):
+    """Run the fleet against the fake nodes with 1, 2, 4... workers (up to one per CPU core) and print the parse rate."""
+    ready = multiprocessing.Queue()
+    servers = []
+    ports = []
+
+    # The fake nodes live in their own processes so they don't compete with the parent for the GIL
+    for i in range(serverProcesses):
+        p = multiprocessing.Process(target=fakeNodes, args=(nodeCount // serverProcesses, ready))
+        p.daemon = True
+        p.start()
+        servers.append(p)
+
+    for p in servers:
+        ports.extend(ready.get())
+
+    nodes = [("127.0.0.1", port) for port in ports]
+
+    workers = 1
+    while True:
+        fleet = LWRPFleet(nodes, workers=workers)
+        fleet.start()
+
+        # Let the connections settle before we start counting
+        time.sleep(1)
+        startCount = fleet.parsedMessages()
+        startTime = time.time()
+
+        time.sleep(duration)
+
+        rate = (fleet.parsedMessages() - startCount) / (time.time() - startTime)
+        fleet.stop()
+
+        print(str(workers) + " worker(s): " + str(int(rate)) + " messages/second")
+
+        if workers >= multiprocessing.cpu_count():
+            break
+
+        workers = min(workers * 2, multiprocessing.cpu_count())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()